@@ -1,4 +1,4 @@
-import solver
+import excel_solver as solver
 
 solver.solve(
     problem_type = "min",
@@ -1,13 +1,47 @@
 # Maintainer:     Ryan Young
 # Last Modified:  Nov 30, 2022
+import copy
+import hashlib
+import string
+import threading
+import warnings
+from collections import OrderedDict
 from typing import Iterable
 import numpy as np
 from scipy.optimize import linprog, OptimizeResult
+from scipy.sparse import csr_matrix, diags, issparse
 
 """
 A wrapper for scipy's linear programming function to act like Excel Solver
 """
 
+# Decision variables are displayed as a, b, c, ..., z, aa, ab, ... (see _labels)
+_ALPHABET = string.ascii_lowercase
+
+# Solutions to the most recently solved models, keyed by _digest() of the model
+_CACHE_SIZE = 128
+_solutions: OrderedDict[bytes, OptimizeResult] = OrderedDict()
+_solutions_lock = threading.Lock()
+
+def _labels(n: int) -> list[str]:
+    """
+    Names for n decision variables, lettered like Excel columns
+
+    >>> _labels(29)[24:]
+    ['y', 'z', 'aa', 'ab', 'ac']
+    """
+    if n <= len(_ALPHABET):
+        return list(_ALPHABET[:n])
+    labels = []
+    for i in range(1, n + 1):
+        label = ""
+        while i:
+            i, rem = divmod(i - 1, len(_ALPHABET))
+            label = _ALPHABET[rem] + label
+        labels.append(label)
+    return labels
+
+
 def validate(
     obj: list | np.ndarray,
     c_l: list[list] | np.ndarray,
@@ -33,7 +67,8 @@ def validate(
         print("Please choose 'max' or 'min' for the problem type")
         errors += 1
 
-    if ">" in signs or "<" in signs:
+    signs = np.asarray(signs)
+    if np.any((signs == ">") | (signs == "<")):
         print("Use of '<' and '>' prohibited. Use '<=' or '>=' instead.")
         errors += 1
 
@@ -49,33 +84,28 @@ def print_objective_function(
     ------------------------------------------------------
     MAXIMIZE: z = 16a - 20.5b + 14c
     ------------------------------------------------------
+    >>> print_objective_function([np.inf, 1.5], "min")
+    ------------------------------------------------------
+    MINIMIZE: z = infa + 1.5b
+    ------------------------------------------------------
     """
-    alphabet = "abcdefghijklmnopqrstuvwxyz"
-    print('------------------------------------------------------')
-
-    if isinstance(obj, list):
-        obj = np.array(obj)
-
-    if problem_type == "max":
-        print("MAXIMIZE: z = ", end="")
-    elif problem_type == "min":
-        print("MINIMIZE: z = ", end="")
-
-    if obj[0].is_integer():
-        print(f"{int(obj[0])}a", end="")
-    else:
-        print(f"{obj[0]}a", end="")
-    for i in range(1, len(obj)):
-        num = round(obj[i], ndigits=2)
-        if num.is_integer():
-            num = int(num)
-        if num < 0:
-            display_num = f"- {num*-1}"
-        else:
-            display_num = f"+ {num}"
-        print(f" {display_num}{alphabet[i]}", end="")
-
-    print('\n------------------------------------------------------')
+    # Round once for the whole array, then drop the '.0' from whole numbers
+    obj = np.round(np.asarray(obj, dtype=np.float64), 2)
+    is_int = np.isfinite(obj) & (np.modf(obj)[0] == 0)
+    nums = [int(num) if whole else num for num, whole in zip(obj.tolist(), is_int.tolist())]
+
+    labels = _labels(len(nums))
+    terms = [f"{nums[0]}{labels[0]}"] + [
+        f"{'-' if num < 0 else '+'} {abs(num)}{label}"
+        for num, label in zip(nums[1:], labels[1:])
+    ]
+    goal = "MAXIMIZE" if problem_type == "max" else "MINIMIZE"
+
+    print(
+        "------------------------------------------------------\n"
+        f"{goal}: z = {' '.join(terms)}\n"
+        "------------------------------------------------------"
+    )
 
 
 def print_results(
@@ -84,29 +114,151 @@ def print_results(
     """
     Print results
     """
-    np.set_printoptions(precision=2, suppress=True)
     optimal = round(solution.fun, ndigits=2)
     if optimal % 1 == 0:
         optimal = int(solution.fun)
     # For maximization problem, reverse the sign of optimal value
     optimal = optimal*-1 if ptype == "max" else optimal
-    print(f"OPTIMAL VALUE:  {optimal}")
-    print("------------------------------------------------------")
-    print("QUANTITIES:")
-
-    alphabet = "abcdefghijklmnopqrstuvwxyz"
-    for i in range(0, len(solution.x)):
-        num = round(solution.x[i], ndigits=5)
-        if num % 1 == 0:
-            print(f"{alphabet[i]}:  {int(num)}")
+
+    x = np.round(solution.x, 5)
+    is_int = np.isfinite(x) & (np.modf(x)[0] == 0)
+    quantities = [
+        f"{label}:  {int(num) if whole else num}"
+        for label, num, whole in zip(_labels(x.size), x.tolist(), is_int.tolist())
+    ]
+
+    print("\n".join([
+        f"OPTIMAL VALUE:  {optimal}",
+        "------------------------------------------------------",
+        "QUANTITIES:",
+        *quantities,
+        "------------------------------------------------------",
+        # f"Iterations: {solution.nit}",
+        solution.message,
+    ]))
+
+
+
+def _digest(*parts) -> bytes:
+    """
+    Short fingerprint of a model, so the cache never keeps copies of its matrices
+    """
+    h = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        if issparse(part) or isinstance(part, np.ndarray):
+            buffers = (part.data, part.indices, part.indptr) if issparse(part) else (part,)
+            h.update(repr((type(part).__name__, part.shape)).encode())
+            for buf in buffers:
+                h.update(buf.dtype.str.encode())
+                h.update(np.ascontiguousarray(buf))
         else:
-            print(f"{alphabet[i]}:  {num}")
+            h.update(repr(part).encode())
+    return h.digest()
 
-    print("------------------------------------------------------")
-    # print(f"Iterations: {solution.nit}")
-    print(solution.message)
+
+def _freeze_bounds(bounds: Iterable | None) -> tuple | None:
+    """
+    Bounds may be a single (min, max) pair or one pair per variable
+    """
+    if bounds is None:
+        return None
+    return tuple(
+        tuple(b) if isinstance(b, (list, tuple, np.ndarray)) else b
+        for b in bounds
+    )
+
+
+def _should_sparsify(arr: np.ndarray | csr_matrix | None) -> bool:
+    """
+    Large constraint matrices that are mostly zeros are cheaper for HiGHS as CSR
+    """
+    return arr is not None and not issparse(arr) and arr.size > 1024 and np.count_nonzero(arr) < arr.size / 2
 
 
+def _sparsify(arr: np.ndarray | csr_matrix | None) -> np.ndarray | csr_matrix | None:
+    return csr_matrix(arr) if _should_sparsify(arr) else arr
+
+
+def _is_private(arr: np.ndarray, source) -> bool:
+    """
+    True if np.asarray(source) had to copy, so arr is safe to modify in place
+
+    Caller arrays with ">=" rows come back unchanged, whatever their layout or type:
+
+    >>> A = np.array([[1.0, 1, 1], [1, -2, 0], [0, 0, 1]])
+    >>> for c_l in (A.copy(), np.asfortranarray(A), np.asmatrix(A.copy())):
+    ...     c_r = np.array([1000.0, 0, 340])
+    ...     sol = solve("min", [10, 15, 25], c_l, c_r, [">=", ">=", "<="],
+    ...                 display_result=False, skip_validation=True, cache=False)
+    ...     print(np.array_equal(c_l, A), c_r.tolist())
+    True [1000.0, 0.0, 340.0]
+    True [1000.0, 0.0, 340.0]
+    True [1000.0, 0.0, 340.0]
+    """
+    if isinstance(source, np.ndarray):
+        # Covers subclasses (np.matrix, np.memmap) and views of caller data
+        return not np.may_share_memory(arr, source)
+    # Lists convert into a new buffer; anything else may hand back a view of its own data
+    return arr.flags.owndata
+
+
+def _choose_method(n: int, m: int, nnz: int, has_eq: bool) -> str:
+    """
+    Pick a HiGHS algorithm from the shape of the model (n vars, m constraints)
+    """
+    # Interior point wins on big sparse models
+    if (n > 1000 or m > 10_000) and nnz < n * m / 2:
+        return "highs-ipm"
+    # Dual simplex always ends on a basic solution
+    if has_eq:
+        return "highs-ds"
+    return "highs"
+
+
+def _linprog(
+    obj: np.ndarray,
+    c_l: np.ndarray | csr_matrix | None,
+    c_r: np.ndarray | None,
+    equalities_left: np.ndarray | csr_matrix | None,
+    equalities_right: np.ndarray | None,
+    bounds: Iterable | None,
+    method: str,
+    cache: bool,
+) -> OptimizeResult:
+    """
+    linprog(), optionally memoized on the exact model passed to it.
+    Cached solutions are copied on the way out, so callers can't alter them.
+    """
+    if cache:
+        key = _digest(
+            obj, c_l, c_r, equalities_left, equalities_right, _freeze_bounds(bounds), method
+        )
+        with _solutions_lock:
+            cached = _solutions.get(key)
+            if cached is not None:
+                _solutions.move_to_end(key)
+        if cached is not None:
+            return copy.deepcopy(cached)
+
+    solution = linprog(
+        obj,
+        A_ub=_sparsify(c_l),
+        b_ub=c_r,
+        A_eq=_sparsify(equalities_left),
+        b_eq=equalities_right,
+        bounds=bounds,
+        method=method
+    )
+
+    if not cache:
+        return solution
+
+    with _solutions_lock:
+        _solutions[key] = solution
+        if len(_solutions) > _CACHE_SIZE:
+            _solutions.popitem(last=False)
+    return copy.deepcopy(solution)
+
 
 def solve(
     problem_type: str,
@@ -118,11 +270,25 @@ def solve(
     minimum_for_all: int | float = None,
     maximum_for_all: int | float = None,
     bounds: np.ndarray | None = None,
-    method: str = "highs",
+    method: str = "auto",
     display_result: bool = True,
+    skip_validation: bool = False,
+    raw: bool = False,
+    cache: bool = True,
 ) -> OptimizeResult | None:
     """
     Translates the Solver-like input into a scipy 'linprog()' call.
+    Programmatic callers solving many models they've already checked
+    (benchmarks, batch jobs) can pass skip_validation=True.
+
+    For parameter sweeps, raw=True skips validation and all input conversion.
+    The objective and constraints_right must then be numeric ndarrays, and
+    constraints_left a numeric ndarray or scipy sparse matrix (float64 avoids
+    any conversion). Pass a precomputed bounds list too, so it isn't rebuilt
+    on every call.
+
+    Re-solving an identical model returns a copy of the cached solution.
+    Sweeps where every model is different can pass cache=False.
 
     >>> solve(
     ...     problem_type = "min",
@@ -157,70 +323,143 @@ def solve(
     c:  340
     ------------------------------------------------------
     Optimization terminated successfully. (HiGHS Status 7: Optimal)
-    """
 
-    validate(
-        obj=objective_function,
-        c_l=constraints_left,
-        c_r=constraints_right,
-        signs=constraints_signs,
-        problem_type=problem_type
-    )
+    The same model with raw=True, as integer ndarrays and as a sparse matrix:
+
+    >>> from scipy.sparse import csr_matrix
+    >>> A = np.array([[1, 1, 1], [1, -2, 0], [0, 0, 1]])
+    >>> for c_l in (A, csr_matrix(A)):
+    ...     sol = solve("min", np.array([10, 15, 25]), c_l, np.array([1000, 0, 340]),
+    ...                 [">=", ">=", ">="], display_result=False, raw=True)
+    ...     print(sol.status, round(sol.fun, 2), sol.x.round(5).tolist())
+    0 15100.0 [660.0, 0.0, 340.0]
+    0 15100.0 [660.0, 0.0, 340.0]
+
+    Changing a returned solution doesn't affect later solves of the same model,
+    and cache=False always solves from scratch without touching the cache:
+
+    >>> model = ("min", [10, 15, 25], A.tolist(), [1000, 0, 340], [">=", ">=", ">="])
+    >>> first = solve(*model, display_result=False)
+    >>> first.x[0] = 999
+    >>> solve(*model, display_result=False).x.round(5).tolist()
+    [660.0, 0.0, 340.0]
+    >>> _solutions.clear()
+    >>> solve(*model, display_result=False, cache=False).x.round(5).tolist()
+    [660.0, 0.0, 340.0]
+    >>> len(_solutions)
+    0
+    """
 
-    # convert to numpy so we can multiply by scalars
-    obj = np.array(objective_function)
-    c_l = np.array(constraints_left)
-    c_r = np.array(constraints_right)
-    signs = np.array(constraints_signs)
+    if raw:
+        obj = objective_function
+        c_l = constraints_left.tocsr() if issparse(constraints_left) else constraints_left
+        c_r = constraints_right
+        signs = constraints_signs
+    else:
+        if not skip_validation:
+            validate(
+                obj=objective_function,
+                c_l=constraints_left,
+                c_r=constraints_right,
+                signs=constraints_signs,
+                problem_type=problem_type
+            )
+
+        # convert to numpy so we can multiply by scalars
+        # (float64 ndarrays from the caller are used as-is, not copied)
+        obj = np.asarray(objective_function, dtype=np.float64)
+        c_l = np.asarray(constraints_left, dtype=np.float64)
+        c_r = np.asarray(constraints_right, dtype=np.float64)
+        # Signs stay a plain list; boolean masks are built from it as needed
+        signs = list(constraints_signs)
 
     # Pretty-print the objective function
-    print_objective_function(obj, problem_type)
+    if display_result:
+        print_objective_function(obj, problem_type)
 
     if not bounds:
-        # Default bounds array: a 2d array with len(obj) # of rows, where each row is [0, None]
+        # Default bounds: every variable gets (0, None)
         # Excel translation: by default, enable 'Make Unconstrained Vars Non-Negative'
-        bounds = np.repeat([[0, None]], len(obj), axis=0)
-
-        # The "[:,x]" used below sets column x of each row to the given scalar
-        if make_unconstrained_non_negative == False:
-            bounds[:,0] = None
+        lower = 0 if make_unconstrained_non_negative else None
+        upper = None
 
-        if minimum_for_all:
-            bounds[:,0] = minimum_for_all
+        if minimum_for_all is not None:
+            lower = minimum_for_all
 
-        if maximum_for_all:
-            bounds[:,1] = maximum_for_all
+        if maximum_for_all is not None:
+            upper = maximum_for_all
 
-        # Convert bounds 2d array to list of tuples
-        bounds = [tuple(x) for x in bounds]
+        bounds = [(lower, upper)] * len(obj)
 
     # Reverse coefficient +/- sign for maximization problem
     if problem_type == "max":
-        obj *= -1
-
-    # Reverse constraint +/- sign where inequality is ">="
-    c_r[signs == ">="] *= -1
-    c_l[signs == ">="] *= -1
-
-    # Delete all equalities from c_l and c_r. Move them to their own arrays
-    if "=" in signs:
-        equalities_left = c_l[signs == "="]
-        equalities_right = c_r[signs == "="]
-        c_l = np.delete(c_l, np.where(signs == "="), 0)
-        c_r = np.delete(c_r, np.where(signs == "="), 0)
-    else:
-        equalities_left = None
-        equalities_right = None
+        obj = -obj
+
+    equalities_left = None
+    equalities_right = None
+
+    # Models with only "<=" constraints are already in linprog's form
+    if not all(sign == "<=" for sign in signs):
+        # Reverse constraint +/- sign where inequality is ">="
+        ge_mask = np.fromiter((sign == ">=" for sign in signs), dtype=bool, count=len(signs))
+        if ge_mask.any():
+            row_signs = np.where(ge_mask, -1.0, 1.0)
+
+            # Never flip signs inside arrays the caller passed in. Those get a
+            # new C-contiguous buffer in one multiply, instead of copy + negate
+            if _is_private(c_r, constraints_right):
+                np.negative(c_r, where=ge_mask, out=c_r)
+            else:
+                c_r = c_r * row_signs
+
+            if issparse(c_l):
+                c_l = (diags(row_signs) @ c_l).tocsr()
+            elif _is_private(c_l, constraints_left):
+                np.negative(c_l, where=ge_mask[:, None], out=c_l)
+            else:
+                c_l = np.multiply(c_l, row_signs[:, None], order="C")
+
+        # Delete all equalities from c_l and c_r. Move them to their own arrays
+        eq_mask = np.fromiter((sign == "=" for sign in signs), dtype=bool, count=len(signs))
+        if eq_mask.any():
+            equalities_left = c_l[eq_mask]
+            equalities_right = c_r[eq_mask]
+            keep = ~eq_mask
+            c_l = c_l[keep]
+            c_r = c_r[keep]
+
+    # All equalities: pass no inequality arrays at all, rather than empty ones
+    if not c_l.shape[0]:
+        c_l = None
+        c_r = None
 
     # Solve linear programming problem
-    solution = linprog(
+    if method == "simplex":
+        warnings.warn(
+            "method='simplex' is deprecated (and removed from recent scipy). Using 'highs-ds' instead.",
+            DeprecationWarning,
+            stacklevel=2,
+        )
+        method = "highs-ds"
+    elif method == "auto":
+        matrices = [a for a in (c_l, equalities_left) if a is not None]
+        method = _choose_method(
+            n=len(obj),
+            m=sum(a.shape[0] for a in matrices),
+            nnz=sum(a.nnz if issparse(a) else np.count_nonzero(a) for a in matrices),
+            has_eq=equalities_left is not None,
+        )
+
+    # Identical models (common when re-running a notebook cell) reuse the cached result
+    solution = _linprog(
         obj,
-        A_ub=c_l,
-        b_ub=c_r,
-        A_eq=equalities_left,
-        b_eq=equalities_right,
-        bounds=bounds,
-        method=method
+        c_l,
+        c_r,
+        equalities_left,
+        equalities_right,
+        bounds,
+        method,
+        cache,
     )
 
     if display_result == True: